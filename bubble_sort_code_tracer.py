@@ -17,97 +17,185 @@ What this does
 
 Notes
 - This is self-contained and intended for local use (desktop Python).
+- If numba is installed (pip install numba) the trace is produced by a JIT-compiled kernel; otherwise the same kernel runs as plain Python.
 - The displayed source is the same algorithm executed by the tracer generator, so the highlighted lines map to actual operations.
 """
 
 import argparse
-import random
-import textwrap
+from collections import namedtuple
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
+import matplotlib.colors as mcolors
+from matplotlib.collections import PolyCollection
+
+try:
+    from numba import njit
+except ImportError:  # numba is optional; the trace kernel then runs as plain Python
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
 
 # The source code we will display (must match the traced logic below).
-SOURCE = textwrap.dedent("""
-def bubble_sort(a):
-    n = len(a)
-    if n <= 1:
-        return a
-    for passnum in range(n - 1):
-        made_swap = False
-        # inner loop: compare adjacent pairs
-        for j in range(n - passnum - 1):
-            # compare a[j] and a[j+1]
-            if a[j] > a[j+1]:
-                # swap them
-                a[j], a[j+1] = a[j+1], a[j]
-                made_swap = True
-        # optional early exit
-        if not made_swap:
-            break
+SOURCE = (
+    "def bubble_sort(a):",
+    "    n = len(a)",
+    "    if n <= 1:",
+    "        return a",
+    "    for passnum in range(n - 1):",
+    "        made_swap = False",
+    "        # inner loop: compare adjacent pairs",
+    "        for j in range(n - passnum - 1):",
+    "            # compare a[j] and a[j+1]",
+    "            if a[j] > a[j+1]:",
+    "                # swap them",
+    "                a[j], a[j+1] = a[j+1], a[j]",
+    "                made_swap = True",
+    "        # optional early exit",
+    "        if not made_swap:",
+    "            break",
+    "    return a",
+)
+
+
+# Trace action codes (Step.action)
+ENTER, COMPARE, SWAP, PASS_END, DONE = range(5)
+
+# One tracing frame; a plain tuple so fields are read by position, not dict lookup.
+Step = namedtuple('Step', 'action line passnum i j comparisons swaps')
+
+
+@njit('i8(i1[:], i1[:], i4[:], i4[:], i8, i8, i8, i8, i8)', cache=True)
+def _record(ops, lines, passnums, i_idx, k, op, line, passnum, i):
+    ops[k] = op
+    lines[k] = line
+    passnums[k] = passnum
+    i_idx[k] = i
+    return k + 1
+
+
+def _as_int_array(arr):
+    """Return a contiguous int64 copy of arr, rejecting non-integer values."""
+    src = np.asarray(arr)
+    a = src.astype(np.int64)
+    if not np.array_equal(a, src):
+        raise ValueError("bubble sort visualization takes integers only")
     return a
-""").strip().splitlines()
 
 
-def bubble_sort_trace(arr):
-    """
-    Generator that executes bubble sort on a copy of arr and yields tracing frames.
+def _trace_size(n):
+    """Exact upper bound on the number of trace events for an array of length n."""
+    # 3 fixed events + per pass (2 headers + pass_end + 2 per pair)
+    passes = max(n - 1, 0)
+    return 3 + 3 * passes + n * passes
 
-    Each yielded frame is a dict:
-      { 'action': 'enter'|'compare'|'swap'|'pass_end'|'done',
-        'line': <line_index in SOURCE (0-based) to highlight>,
-        'passnum': current pass number or -1,
-        'i': index j used for comparisons / swaps or -1,
-        'j': index j+1 or -1,
-        'array': snapshot list
-      }
-    """
-    a = arr[:]  # work copy
-    n = len(a)
 
-    # initial / function entry
-    yield dict(action='enter', line=0, passnum=-1, i=-1, j=-1, array=a.copy())
+# Explicit signatures make numba compile these eagerly at import and cache the
+# machine code next to the module, so later runs skip compilation entirely.
+@njit('i8(i8[:], i1[:], i1[:], i4[:], i4[:])', cache=True)
+def _trace_kernel(a, ops, lines, passnums, i_idx):
+    """
+    Run bubble sort in place on the int64 array a and record the trace into the
+    preallocated parallel buffers (op code, SOURCE line, passnum, index j), each
+    at least _trace_size(len(a)) long. Returns the number of events written.
+    """
+    n = a.shape[0]
 
-    # n = len(a)
-    yield dict(action='enter', line=1, passnum=-1, i=-1, j=-1, array=a.copy())
+    # function entry, then n = len(a)
+    k = _record(ops, lines, passnums, i_idx, 0, ENTER, 0, -1, -1)
+    k = _record(ops, lines, passnums, i_idx, k, ENTER, 1, -1, -1)
 
     if n <= 1:
         # return a
-        yield dict(action='done', line=2, passnum=-1, i=-1, j=-1, array=a.copy())
-        return
+        k = _record(ops, lines, passnums, i_idx, k, DONE, 2, -1, -1)
+        return k
 
-    # for passnum in range(n - 1):
+    last_pass = 0
     for passnum in range(n - 1):
-        # highlight line that sets made_swap
-        yield dict(action='enter', line=3, passnum=passnum, i=-1, j=-1, array=a.copy())
-
+        last_pass = passnum
+        # highlight line that sets made_swap, then the inner loop header
+        k = _record(ops, lines, passnums, i_idx, k, ENTER, 3, passnum, -1)
         made_swap = False
-        # comment / inner loop header
-        yield dict(action='enter', line=4, passnum=passnum, i=-1, j=-1, array=a.copy())
+        k = _record(ops, lines, passnums, i_idx, k, ENTER, 4, passnum, -1)
 
         for j in range(n - passnum - 1):
             # compare line (line 6 in SOURCE: the if a[j] > a[j+1])
-            yield dict(action='compare', line=6, passnum=passnum, i=j, j=j + 1, array=a.copy())
+            k = _record(ops, lines, passnums, i_idx, k, COMPARE, 6, passnum, j)
             if a[j] > a[j + 1]:
                 # swap line (line 8)
-                a[j], a[j + 1] = a[j + 1], a[j]
+                tmp = a[j]
+                a[j] = a[j + 1]
+                a[j + 1] = tmp
                 made_swap = True
-                yield dict(action='swap', line=8, passnum=passnum, i=j, j=j + 1, array=a.copy())
+                k = _record(ops, lines, passnums, i_idx, k, SWAP, 8, passnum, j)
         # optional early exit line (line 10)
-        yield dict(action='pass_end', line=10, passnum=passnum, i=-1, j=-1, array=a.copy())
+        k = _record(ops, lines, passnums, i_idx, k, PASS_END, 10, passnum, -1)
         if not made_swap:
             break
 
     # final return
-    yield dict(action='done', line=11, passnum=passnum if n>1 else -1, i=-1, j=-1, array=a.copy())
+    k = _record(ops, lines, passnums, i_idx, k, DONE, 11, last_pass, -1)
+    return k
+
+
+def bubble_sort_trace(arr):
+    """
+    Generator that executes bubble sort on a copy of arr and yields tracing frames.
+
+    Each yielded frame is a Step namedtuple:
+      Step(action=ENTER|COMPARE|SWAP|PASS_END|DONE,
+           line=<line_index in SOURCE (0-based) to highlight>,
+           passnum=current pass number or -1,
+           i=index j used for comparisons / swaps or -1,
+           j=index j+1 or -1,
+           comparisons=compares made so far, including this frame,
+           swaps=swaps made so far, including this frame)
+
+    Frames carry no array snapshot; replay the SWAP frames on a copy of arr
+    to reconstruct the array state at any frame.
+
+    The sort itself runs up front in _trace_kernel (JIT-compiled when numba is
+    installed); frames are only wrapped into Steps as they are consumed.
+    """
+    a = _as_int_array(arr)  # work copy
+    size = _trace_size(len(a))
+    ops = np.empty(size, dtype=np.int8)
+    lines = np.empty(size, dtype=np.int8)
+    passnums = np.empty(size, dtype=np.int32)
+    i_idx = np.empty(size, dtype=np.int32)
+    count = _trace_kernel(a, ops, lines, passnums, i_idx)
+    ops = ops[:count]
+    # running counters are a function of the frame index alone, so compute them
+    # for the whole trace at once rather than incrementing per frame
+    comparisons = np.cumsum(ops == COMPARE)
+    swaps = np.cumsum(ops == SWAP)
+    for op, line, passnum, i, n_cmp, n_swp in zip(ops.tolist(), lines[:count].tolist(),
+                                                  passnums[:count].tolist(), i_idx[:count].tolist(),
+                                                  comparisons.tolist(), swaps.tolist()):
+        yield Step(op, line, passnum, i, i + 1 if i >= 0 else -1, n_cmp, n_swp)
 
 
 def make_tracer_animation(arr, interval=220, title="Bubble Sort: code tracer"):
-    steps = list(bubble_sort_trace(arr))
-    if not steps:
-        raise RuntimeError("No trace steps produced.")
+    arr0 = _as_int_array(arr)
+    n = len(arr0)
+    # bubble sort only permutes arr, so its max is fixed for the whole animation
+    arr_max = int(arr0.max())
+    # ...and the set of values is fixed too, so each bar label is formatted once
+    labels = {v: str(v) for v in set(arr0.tolist())}
+
+    def frames():
+        """
+        Stream (frame_index, step, array) tuples straight from bubble_sort_trace.
+        Each stream advances its own working array one swap at a time, so no
+        frame list or array snapshots are ever held.
+        """
+        current = arr0.copy()
+        for frame_index, step in enumerate(bubble_sort_trace(arr0)):
+            if step.action == SWAP:
+                current[step.i], current[step.j] = current[step.j], current[step.i]
+            yield (frame_index, step, current)
 
-    n = len(arr)
     indices = np.arange(n)
 
     # Build figure with three areas: code (left), bars (right), status (bottom)
@@ -124,32 +212,50 @@ def make_tracer_animation(arr, interval=220, title="Bubble Sort: code tracer"):
     ax_bars = fig.add_subplot(gs[0, 1:])
     ax_bars.set_title("Array state")
     ax_bars.set_xlim(-0.5, n - 0.5)
-    padding = max(1, int(max(arr) * 0.05))
-    ax_bars.set_ylim(0, max(arr) + padding)
+    padding = max(1, int(arr_max * 0.05))
+    ax_bars.set_ylim(0, arr_max + padding)
 
     # Status / counters
     ax_status = fig.add_subplot(gs[1, 1:])
     ax_status.axis('off')
 
     # Prepare code text layout
-    # Precompute text objects for each line
-    code_y = np.linspace(0.95, 0.05, len(SOURCE))  # top to bottom
-    code_texts = []
-    for i, line in enumerate(SOURCE):
-        t = ax_code.text(0.01, code_y[i], line.rstrip(), transform=ax_code.transAxes,
-                         fontsize=10, fontfamily='monospace', va='top', color='#000000')
-        code_texts.append(t)
+    # The whole listing is one text artist; per-line positions are measured from
+    # its rendered extent (see measure_code_lines) once the layout is final.
+    code_top = 0.97
+    code_artist = ax_code.text(0.01, code_top, "\n".join(line.rstrip() for line in SOURCE),
+                               transform=ax_code.transAxes, fontsize=10, fontfamily='monospace',
+                               va='top', color='#000000', linespacing=1.2)
+    highlight_y = None  # highlight rectangle bottom for each SOURCE line, in axes coords
+
+    def measure_code_lines(event=None):
+        """Size the highlight to one line and precompute its y for every line."""
+        nonlocal highlight_y
+        bbox = code_artist.get_window_extent().transformed(ax_code.transAxes.inverted())
+        line_height = bbox.height / len(SOURCE)
+        # text is anchored top, so line k spans one line height below its top
+        highlight_y = code_top - line_height * np.arange(1, len(SOURCE) + 1)
+        highlight_rect.set_height(line_height)
 
     # Rectangle to highlight current line (using axes coords)
     highlight_rect = ax_code.add_patch(plt.Rectangle((0, 0), 1, 0.06, transform=ax_code.transAxes,
                                                     color='gold', alpha=0.18, zorder=0))
     highlight_rect.set_visible(False)
 
-    # Bars (rects) initialization
-    bars = ax_bars.bar(indices, arr, align='center', color='#4f83ff', edgecolor='black')
+    # Bars initialization: one PolyCollection where verts[k] is bar k's rectangle
+    # (bottom-left, top-left, top-right, bottom-right), so heights and colors
+    # are pushed to matplotlib with a single call each per frame.
+    half_width = 0.4
+    verts = np.zeros((n, 4, 2))
+    verts[:, :2, 0] = (indices - half_width)[:, None]
+    verts[:, 2:, 0] = (indices + half_width)[:, None]
+    verts[:, 1:3, 1] = arr0[:, None]
+    idle, compare, swap, done = (mcolors.to_rgba(c) for c in ('#4f83ff', 'gold', 'crimson', 'seagreen'))
+    facecolors = np.tile(idle, (n, 1))
+    bars = ax_bars.add_collection(PolyCollection(verts, facecolors=facecolors, edgecolors='black'))
     bar_texts = []
-    for rect, val in zip(bars, arr):
-        txt = ax_bars.text(rect.get_x() + rect.get_width() / 2, val + 0.02 * max(arr), str(val),
+    for idx, val in enumerate(arr0.tolist()):
+        txt = ax_bars.text(idx, val + 0.02 * arr_max, labels[val],
                            ha='center', va='bottom', color='white', fontsize=9, fontfamily='monospace')
         bar_texts.append(txt)
 
@@ -157,75 +263,104 @@ def make_tracer_animation(arr, interval=220, title="Bubble Sort: code tracer"):
     op_text = ax_status.text(0.01, 0.65, "op: idle", transform=ax_status.transAxes, fontsize=11, fontfamily='monospace')
     info_text = ax_status.text(0.01, 0.15, "", transform=ax_status.transAxes, fontsize=10, fontfamily='monospace', color='#000000')
 
-    comparisons = 0
-    swaps = 0
-
-    def update(frame_index):
-        nonlocal comparisons, swaps
-        step = steps[frame_index]
-        arr_snap = step['array']
-        action = step['action']
-        line_idx = step['line']
-        passnum = step.get('passnum', -1)
-        i = step.get('i', -1)
-        j = step.get('j', -1)
+    # indices recolored by the previous frame; only these need resetting
+    prev_colored = []
+    # bars from sorted_from onwards form the sorted tail and stay green
+    sorted_from = n
+    # (stream array, frame_index) of the last frame drawn
+    last_frame = (None, -1)
+
+    def mark_pair(step, color):
+        """Color the (i, j) bars of a compare/swap step and remember them for reset."""
+        if 0 <= step.i < n:
+            prev_colored.append(step.i)
+        if 0 <= step.j < n:
+            prev_colored.append(step.j)
+        facecolors[prev_colored] = color
+
+    def on_enter(step):
+        op_text.set_text("op: entering / loop header")
+
+    def on_compare(step):
+        op_text.set_text(f"op: compare indices {step.i} ↔ {step.j} (pass {step.passnum})")
+        mark_pair(step, compare)
+
+    def on_swap(step):
+        op_text.set_text(f"op: swap indices {step.i} ↔ {step.j} (pass {step.passnum})")
+        mark_pair(step, swap)
+
+    def on_pass_end(step):
+        nonlocal sorted_from
+        op_text.set_text(f"op: pass end (pass {step.passnum})")
+        # color the tail that's known sorted; only this pass's new bar is
+        # recolored, the rest of the tail is already green
+        tail_start = max(n - (step.passnum + 1), 0)
+        facecolors[tail_start:sorted_from] = done
+        sorted_from = tail_start
+
+    def on_done(step):
+        op_text.set_text("op: done — sorted")
+        facecolors[:] = done
+        prev_colored[:] = range(n)
+
+    # indexed by action code: ENTER, COMPARE, SWAP, PASS_END, DONE
+    handlers = (on_enter, on_compare, on_swap, on_pass_end, on_done)
+
+    def update(frame):
+        nonlocal sorted_from, last_frame
+        frame_index, step, arr_snap = frame
+        # a frame from a restarted stream (e.g. blit re-init on resize) is not a
+        # continuation of the last one drawn
+        sequential = last_frame[0] is arr_snap and frame_index == last_frame[1] + 1
+        last_frame = (arr_snap, frame_index)
+        action, line_idx, passnum, i, j, comparisons, swaps = step
 
         # Highlight current source line
-        # compute rectangle position based on code_y
         if 0 <= line_idx < len(SOURCE):
-            # Use the code text y coordinate to place rectangle. Rectangle height relative approximated.
-            y_top = code_y[line_idx]  # top anchor for text
-            # Because text is anchored top, move rectangle slightly down to cover the text line area
-            rect_height = 0.06
-            highlight_rect.set_y(y_top - rect_height + 0.01)
-            highlight_rect.set_height(rect_height)
+            highlight_rect.set_y(highlight_y[line_idx])
             highlight_rect.set_visible(True)
         else:
             highlight_rect.set_visible(False)
 
         # Update bars heights and colors
-        for idx, rect in enumerate(bars):
-            rect.set_height(arr_snap[idx])
-            # default idle color
-            rect.set_color('#4f83ff')  # blue
-            bar_texts[idx].set_text(str(arr_snap[idx]))
-            bar_texts[idx].set_y(arr_snap[idx] + 0.02 * max(arr) + 0.5)
-
-        if action == 'compare':
-            comparisons += 1
-            op_text.set_text(f"op: compare indices {i} ↔ {j} (pass {passnum})")
-            if 0 <= i < n:
-                bars[i].set_color('gold')
-            if 0 <= j < n:
-                bars[j].set_color('gold')
-        elif action == 'swap':
-            swaps += 1
-            op_text.set_text(f"op: swap indices {i} ↔ {j} (pass {passnum})")
-            if 0 <= i < n:
-                bars[i].set_color('crimson')
-            if 0 <= j < n:
-                bars[j].set_color('crimson')
-        elif action == 'pass_end':
-            op_text.set_text(f"op: pass end (pass {passnum})")
-            # optionally color the tail that's known sorted
-            tail_start = n - (passnum + 1)
-            for k in range(tail_start, n):
-                if 0 <= k < n:
-                    bars[k].set_color('seagreen')
-        elif action == 'enter':
-            op_text.set_text("op: entering / loop header")
-        elif action == 'done':
-            op_text.set_text("op: done — sorted")
-            for rect in bars:
-                rect.set_color('seagreen')
+        if sequential:
+            # only the bars touched last frame (and a swapped pair) change
+            facecolors[prev_colored] = idle
+            changed = (i, j) if action == SWAP else ()
+        else:
+            # out-of-order frame: redraw every bar from the stream's array,
+            # with the tail left sorted by the passes completed before this one
+            facecolors[:] = idle  # blue
+            sorted_from = n - max(passnum, 0)
+            facecolors[sorted_from:] = done
+            changed = range(n)
+        for idx in changed:
+            verts[idx, 1:3, 1] = arr_snap[idx]
+            bar_texts[idx].set_text(labels[arr_snap[idx]])
+            bar_texts[idx].set_y(arr_snap[idx] + 0.02 * arr_max + 0.5)
+        prev_colored.clear()
+
+        handlers[action](step)
+
+        bars.set_verts(verts)
+        bars.set_facecolors(facecolors)
 
         info_text.set_text(f"pass: {passnum if passnum>=0 else '-'}    comparisons: {comparisons}    swaps: {swaps}")
 
-        return (*bars, op_text, info_text, highlight_rect)
+        # with blitting every animated artist is redrawn over the cached background
+        return (bars, *bar_texts, op_text, info_text, highlight_rect)
 
-    ani = animation.FuncAnimation(fig, update, frames=len(steps), interval=interval, blit=False, repeat=False)
     fig.suptitle(title, fontsize=14)
     plt.tight_layout(rect=[0, 0, 1, 0.96])
+    # Measure after layout; resizing changes the axes size, so measure again then
+    # (connected before the animation so it runs ahead of the blit re-init).
+    measure_code_lines()
+    fig.canvas.mpl_connect('resize_event', measure_code_lines)
+
+    # frames is a generator function, so frames are produced on demand and
+    # never cached; save_count tells matplotlib how many to expect at most.
+    ani = animation.FuncAnimation(fig, update, frames=frames, save_count=_trace_size(n), cache_frame_data=False,
+                                  interval=interval, blit=True, repeat=False)
     return ani
 
 
@@ -236,14 +371,12 @@ def main():
     parser.add_argument('--seed', type=int, default=None, help='random seed')
     args = parser.parse_args()
 
-    if args.seed is not None:
-        random.seed(args.seed)
-        np.random.seed(args.seed)
+    rng = np.random.default_rng(args.seed)
 
     if args.n <= 0:
         raise SystemExit("n must be > 0")
 
-    arr = list(np.random.randint(1, args.n * 4 + 1, size=args.n))
+    arr = rng.integers(1, args.n * 4 + 1, size=args.n).tolist()
     print("Initial array:", arr)
 
     ani = make_tracer_animation(arr, interval=args.interval,
@@ -1,101 +1,249 @@
 import argparse
-import random
-import copy
+import shutil
+import subprocess
 import sys
 
 import numpy as np
 import matplotlib.pyplot as plt
 import matplotlib.animation as animation
+import matplotlib.colors as mcolors
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import PolyCollection
+
+
+def _as_int_array(arr):
+    """Return a contiguous int64 copy of arr, rejecting non-integer values."""
+    src = np.asarray(arr)
+    a = src.astype(np.int64)
+    if not np.array_equal(a, src):
+        raise ValueError("bubble sort visualization takes integers only")
+    return a
+
+
+def _bubble_pass(a, m):
+    """
+    Run one bubble-sort pass over a[:m + 1] in place, without a Python loop.
+    Returns the boolean mask of the pairs (j, j + 1) that the pass swapped.
+    """
+    # During a pass the value carried into position j is the running max of
+    # a[:j + 1], so every compare outcome of the pass is known up front.
+    carried = np.maximum.accumulate(a[:m + 1])
+    swap_mask = carried[:m] > a[1:m + 1]
+    # apply the whole pass at once
+    a[:m] = np.where(swap_mask, a[1:m + 1], carried[:m])
+    a[m] = carried[m]
+    return swap_mask
 
 
 def bubble_sort_steps(arr):
     """
-    Generator yielding steps for visualization.
-    Yields tuples: (action, i, j, array_snapshot)
+    Generator yielding delta-encoded steps for visualization.
+    Yields tuples: (action, i, j)
       action: 'compare', 'swap', 'done'
       i, j: indices involved (-1 if none)
-      array_snapshot: shallow copy of current array
+    No array snapshots are produced; replay the 'swap' steps on a copy of
+    the initial array to reconstruct the state at any step.
     """
-    a = arr[:]  # work on copy
+    a = _as_int_array(arr)  # contiguous int64 work copy
     n = len(a)
     if n <= 1:
-        yield ('done', -1, -1, a.copy())
+        yield ('done', -1, -1)
         return
 
     for passnum in range(n - 1):
-        made_swap = False
-        for j in range(n - passnum - 1):
-            # comparison step
-            yield ('compare', j, j + 1, a.copy())
-            if a[j] > a[j + 1]:
-                # swap step
-                a[j], a[j + 1] = a[j + 1], a[j]
-                made_swap = True
-                yield ('swap', j, j + 1, a.copy())
-        # if no swaps were made, array is sorted -> we can finish early
-        if not made_swap:
+        m = n - passnum - 1
+        # if no adjacent pair is out of order, this pass would only compare
+        # -> the array is sorted and we can finish early without emitting it
+        if not np.any(a[:m] > a[1:m + 1]):
             break
+        swap_mask = _bubble_pass(a, m)
 
-    yield ('done', -1, -1, a.copy())
+        # Build the pass's event stream in bulk: one compare per j, followed by
+        # a swap wherever swap_mask is set.
+        counts = 1 + swap_mask
+        js = np.repeat(np.arange(m), counts)
+        is_swap = np.ones(len(js), dtype=bool)
+        is_swap[np.cumsum(counts) - counts] = False
+        for j, swapped in zip(js.tolist(), is_swap.tolist()):
+            yield ('swap' if swapped else 'compare', j, j + 1)
 
+    yield ('done', -1, -1)
 
-def make_animation(data, interval=150, title="Bubble Sort Visualization"):
+
+def bubble_sort_steps_vectorized(arr):
     """
-    Create a matplotlib FuncAnimation from a list of steps produced by bubble_sort_steps.
+    Coarse-grained generator yielding one frame per bubble-sort pass.
+    Yields tuples: (action, first, last, array_snapshot)
+      action: 'pass', 'done'
+      first, last: index range the pass covered (-1 if none)
+      array_snapshot: copy of the array after the pass
+    Intended for the ASCII view, where per-pair frames are too slow to follow.
     """
-    steps = list(data)  # materialize generator into frames
-    if len(steps) == 0:
-        raise ValueError("No steps to animate")
+    a = _as_int_array(arr)  # contiguous int64 work copy
+    n = len(a)
+    for passnum in range(n - 1):
+        m = n - passnum - 1
+        if not np.any(a[:m] > a[1:m + 1]):
+            break  # already sorted
+        _bubble_pass(a, m)
+        yield ('pass', 0, m, a.copy())
+    yield ('done', -1, -1, a.copy())
+
 
-    # final array length from first snapshot
-    _, _, _, arr0 = steps[0]
+def _animation_parts(arr, title):
+    """
+    Build the figure for animating bubble sort on arr.
+    Returns (fig, update, frames, max_frames): each call to frames() starts a
+    fresh frame stream for update(frame), and max_frames bounds its length.
+    """
+    arr0 = _as_int_array(arr)
     n = len(arr0)
+
+    def frames():
+        """
+        Stream (frame_index, action, i, j, array) tuples straight from
+        bubble_sort_steps. Each stream advances its own working array one swap
+        at a time, so no frame list or array snapshots are ever held.
+        """
+        current = arr0.copy()
+        for frame_index, (action, i, j) in enumerate(bubble_sort_steps(arr0)):
+            if action == 'swap':
+                current[i], current[j] = current[j], current[i]
+            yield (frame_index, action, i, j, current)
+
+    # worst case: a compare and a swap for every pair, plus the final 'done'
+    max_frames = n * (n - 1) + 1
+
     indices = np.arange(n)
 
     fig, ax = plt.subplots(figsize=(max(6, n * 0.25), 4))
     plt.title(title)
-    bar_container = ax.bar(indices, arr0, align='center', color='tab:blue', edgecolor='black')
+    # All bars live in one PolyCollection: verts[k] is bar k's rectangle
+    # (bottom-left, top-left, top-right, bottom-right), so heights and colors
+    # are pushed to matplotlib with a single call each per frame.
+    half_width = 0.4
+    verts = np.zeros((n, 4, 2))
+    verts[:, :2, 0] = (indices - half_width)[:, None]
+    verts[:, 2:, 0] = (indices + half_width)[:, None]
+    verts[:, 1:3, 1] = arr0[:, None]
+    idle, compare, swap, done = (mcolors.to_rgba(c) for c in ('tab:blue', 'gold', 'crimson', 'seagreen'))
+    facecolors = np.tile(idle, (n, 1))
+    bar_collection = ax.add_collection(PolyCollection(verts, facecolors=facecolors, edgecolors='black'))
     ax.set_xlim(-0.5, n - 0.5)
-    padding = max(1, int(max(arr0) * 0.05))
-    ax.set_ylim(0, max(arr0) + padding)
+    arr_max = int(arr0.max())  # sorting only permutes arr0, so this never changes
+    padding = max(1, int(arr_max * 0.05))
+    ax.set_ylim(0, arr_max + padding)
 
     # Text to show current operation
     op_text = ax.text(0.02, 0.95, "", transform=ax.transAxes, fontsize=10, verticalalignment='top')
 
-    def update(frame_index):
-        action, i, j, arr = steps[frame_index]
-        # update bar heights
-        for rect, h in zip(bar_container, arr):
-            rect.set_height(h)
-            rect.set_color('tab:blue')  # default
+    # indices recolored by the previous frame; only these need resetting
+    prev_colored = []
+    # (stream array, frame_index) of the last frame drawn
+    last_frame = (None, -1)
+
+    def update(frame):
+        nonlocal prev_colored, last_frame
+        frame_index, action, i, j, arr = frame
+        # a frame from a restarted stream (e.g. blit re-init on resize) is not a
+        # continuation of the last one drawn
+        sequential = last_frame[0] is arr and frame_index == last_frame[1] + 1
+        last_frame = (arr, frame_index)
+        if sequential:
+            # only the bars touched last frame (and a swapped pair) change
+            facecolors[prev_colored] = idle
+            if action == 'swap':
+                verts[i, 1:3, 1] = arr[i]
+                verts[j, 1:3, 1] = arr[j]
+        else:
+            # out-of-order frame: redraw every bar from the stream's array
+            verts[:, 1:3, 1] = arr[:, None]
+            facecolors[:] = idle  # default
+        prev_colored = []
 
         # Color-code relevant bars
         if action == 'compare':
             if 0 <= i < n:
-                bar_container[i].set_color('gold')
+                prev_colored.append(i)
             if 0 <= j < n:
-                bar_container[j].set_color('gold')
+                prev_colored.append(j)
+            facecolors[prev_colored] = compare
             op_text.set_text(f"Comparing indices {i} and {j}")
         elif action == 'swap':
             if 0 <= i < n:
-                bar_container[i].set_color('crimson')
+                prev_colored.append(i)
             if 0 <= j < n:
-                bar_container[j].set_color('crimson')
+                prev_colored.append(j)
+            facecolors[prev_colored] = swap
             op_text.set_text(f"Swapped indices {i} and {j}")
         elif action == 'done':
             # mark all bars as sorted (green)
-            for rect in bar_container:
-                rect.set_color('seagreen')
+            facecolors[:] = done
+            prev_colored = list(range(n))
             op_text.set_text("Sorted ✔")
         else:
             op_text.set_text(str(action))
 
-        return (*bar_container, op_text)
+        bar_collection.set_verts(verts)
+        bar_collection.set_facecolors(facecolors)
+
+        # with blitting every animated artist is redrawn over the cached background
+        return (bar_collection, op_text)
+
+    return fig, update, frames, max_frames
 
-    ani = animation.FuncAnimation(fig, update, frames=len(steps), interval=interval, blit=False, repeat=False)
+
+def make_animation(arr, interval=150, title="Bubble Sort Visualization"):
+    """
+    Create a matplotlib FuncAnimation of bubble sort running on arr.
+    """
+    fig, update, frames, max_frames = _animation_parts(arr, title)
+    # frames is a generator function, so frames are produced on demand and
+    # never cached; save_count tells matplotlib how many to expect at most.
+    ani = animation.FuncAnimation(fig, update, frames=frames, save_count=max_frames, cache_frame_data=False,
+                                  interval=interval, blit=True, repeat=False)
     return ani
 
 
+def save_video(arr, path, fps=10, title="Bubble Sort Visualization"):
+    """
+    Render the animation offscreen and stream raw RGBA frames into an ffmpeg
+    subprocess that encodes them as H.264 (e.g. path='bubble_sort.mp4').
+    Frames are never held in memory or encoded by matplotlib itself.
+    Requires the ffmpeg executable on PATH.
+    """
+    ffmpeg = shutil.which('ffmpeg')
+    if ffmpeg is None:
+        raise RuntimeError("ffmpeg was not found on PATH")
+
+    fig, update, frames, _ = _animation_parts(arr, title)
+    canvas = FigureCanvasAgg(fig)
+    canvas.draw()
+    width, height = canvas.get_width_height(physical=True)
+    cmd = [ffmpeg, '-y', '-loglevel', 'error',
+           '-f', 'rawvideo', '-pix_fmt', 'rgba', '-s', f'{width}x{height}', '-r', str(fps), '-i', '-',
+           # yuv420p needs even dimensions
+           '-vf', 'pad=ceil(iw/2)*2:ceil(ih/2)*2',
+           '-c:v', 'libx264', '-preset', 'ultrafast', '-pix_fmt', 'yuv420p', path]
+    proc = subprocess.Popen(cmd, stdin=subprocess.PIPE)
+    try:
+        for frame in frames():
+            update(frame)
+            canvas.draw()
+            proc.stdin.write(canvas.buffer_rgba())
+    except BrokenPipeError:
+        pass  # ffmpeg exited early; its return code is reported below
+    finally:
+        try:
+            proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        proc.wait()
+        plt.close(fig)
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg exited with status {proc.returncode}")
+
+
 def ascii_visual(arr, width=50):
     """
     Simple ASCII visualization for terminal: prints horizontal bars scaled to width.
@@ -114,15 +262,15 @@ def main():
     parser.add_argument('--interval', type=int, default=150, help='milliseconds between frames')
     parser.add_argument('--seed', type=int, default=None, help='random seed')
     parser.add_argument('--ascii', action='store_true', help='print ASCII steps in terminal (non-graphical)')
+    parser.add_argument('--per-pass', action='store_true', help='with --ascii, print one frame per pass instead of per compare/swap')
     parser.add_argument('--array', type=str, default=None, help='comma-separated list of integers to sort (e.g. 5,2,9,1)')
+    parser.add_argument('--save', type=str, default=None, metavar='PATH', help='save the animation as a video (e.g. bubble_sort.mp4) via ffmpeg instead of showing it')
     args, unknown = parser.parse_known_args()
 
     # If running from VSCode "Run" button, sys.argv will only have the script name
     interactive = (len(sys.argv) == 1)
 
-    if args.seed is not None:
-        random.seed(args.seed)
-        np.random.seed(args.seed)
+    rng = np.random.default_rng(args.seed)
 
     data = []
     if interactive:
@@ -145,6 +293,8 @@ def main():
             return
         interval = 150
         ascii_mode = False
+        per_pass = False
+        save_path = None
     else:
         if args.array is not None:
             try:
@@ -166,7 +316,7 @@ def main():
             if args.n <= 0:
                 print("n must be > 0 if --array is not provided")
                 return
-            data = list(np.random.randint(1, args.n * 5 + 1, size=args.n))
+            data = rng.integers(1, args.n * 5 + 1, size=args.n).tolist()
         else:
             try:
                 user_input = input("Enter a comma or space separated list of integers to sort (e.g. 5,2,9,1 or 5 2 9 1): ")
@@ -186,6 +336,8 @@ def main():
                 return
         interval = args.interval
         ascii_mode = args.ascii
+        per_pass = args.per_pass
+        save_path = args.save
 
     print("Initial array:", data)
 
@@ -193,8 +345,16 @@ def main():
 
     if ascii_mode:
         import time
-        for step in bubble_sort_steps(data[:]):
-            action, i, j, arr = step
+        arr = data[:]
+        steps = bubble_sort_steps_vectorized(data) if per_pass else bubble_sort_steps(data[:])
+        for step in steps:
+            if per_pass:
+                action, i, j, snapshot = step
+                arr = snapshot.tolist()
+            else:
+                action, i, j = step
+                if action == 'swap':
+                    arr[i], arr[j] = arr[j], arr[i]
             print("\033[H\033[J", end="")  # clear terminal (works on many terminals)
             print(f"Action: {action}  indices: {i},{j}")
             ascii_visual(arr, width=60)
@@ -206,22 +366,19 @@ def main():
             print("Sorted array:", sorted_arr)
         return
 
-    ani = make_animation(bubble_sort_steps(data[:]), interval=interval,
-                         title="Bubble Sort Visualization (blue=idle, yellow=compare, red=swap, green=done)")
-
-    plt.show()
-
-    for step in bubble_sort_steps(data[:]):
-        action, i, j, arr = step
-        if action == 'done':
-            sorted_arr = arr
-    if sorted_arr is not None:
-        print("Sorted array:", sorted_arr)
+    title = "Bubble Sort Visualization (blue=idle, yellow=compare, red=swap, green=done)"
+    if save_path is not None:
+        try:
+            save_video(data[:], save_path, fps=1000 / max(interval, 1), title=title)
+        except (OSError, RuntimeError) as e:
+            print("Error saving animation:", e)
+            return
+        print("Saved animation to", save_path)
+    else:
+        ani = make_animation(data[:], interval=interval, title=title)
+        plt.show()
 
-    # If you'd like to save the animation to file (mp4 or gif), uncomment below:
-    # Requires ffmpeg (for mp4) or pillow (for gif). Example to save:
-    # ani.save('bubble_sort.mp4', writer='ffmpeg', fps=1000/args.interval)
-    # ani.save('bubble_sort.gif', writer='pillow', fps=1000/args.interval)
+    print("Sorted array:", sorted(data))
 
 
 if __name__ == '__main__':